@@ -1,11 +1,16 @@
+import asyncio
 import logging
 import time
 import os
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.staticfiles import StaticFiles
 import pandas as pd
+from cachetools import TTLCache
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
-from .dependencies import es_manager, es
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, ORJSONResponse
+from .dependencies import es_manager, async_es
 
 from .routes.upload import router as upload_router
 from .routes.search import router as search_router
@@ -14,12 +19,24 @@ from .routes.indices import router as indices_router
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hilos para las llamadas bloqueantes (cliente síncrono de Elasticsearch y procesamiento de CSV)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=16))
+    yield
+    await async_es.close()
+
 app = FastAPI(
     title="Elasticsearch CSV Search",
     description="Aplicación para cargar CSVs y realizar búsquedas con Elasticsearch",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Comprimir las respuestas de más de 1 KB (resultados de búsqueda con highlights)
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+
 # Manejo global de errores HTTPException
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -54,17 +71,23 @@ app.include_router(search_router, prefix="/api")
 app.include_router(indices_router, prefix="/api")
 
 
+# Caché de 1s para no consultar el estado del clúster en cada petición
+_health_cache = TTLCache(maxsize=1, ttl=1.0)
+
 @app.get("/api/health")
 async def health_check():
+    if "health" in _health_cache:
+        return _health_cache["health"]
     try:
-        es_health = es.cluster.health()
+        es_health = await async_es.cluster.health()
         es_status = es_health['status']
-        return {
+        _health_cache["health"] = {
             "app_status": "ok",
             "elasticsearch_status": es_status,
             "elasticsearch_cluster": es_health['cluster_name'],
             "timestamp": time.time()
         }
+        return _health_cache["health"]
     except Exception as e:
         return {
             "app_status": "ok",
@@ -1,19 +1,35 @@
 import logging
 import os
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, AsyncElasticsearch
 from .elastic_manager import ElasticsearchManager
+from .serializers import ORJSONSerializer
 from .config import ELASTICSEARCH_HOST, ELASTICSEARCH_PORT
 
 logger = logging.getLogger(__name__)
 
+# Opciones de conexión compartidas: pool de conexiones más grande, compresión gzip, reintentos
+# y serialización JSON con orjson (también para las acciones de la indexación masiva)
+client_options = {
+    "serializer": ORJSONSerializer(),
+    "http_compress": True,
+    "connections_per_node": 25,
+    "request_timeout": 30,
+    "retry_on_timeout": True,
+    "max_retries": 3,
+}
+
 # Priorizar la conexión por URL si está disponible (para Vercel)
 elastic_url = os.getenv("ELASTIC_URL")
 
 if elastic_url:
-    es = Elasticsearch([elastic_url])
+    hosts = [elastic_url]
 else:
     # Conexión local
-    es = Elasticsearch([f"http://{ELASTICSEARCH_HOST}:{ELASTICSEARCH_PORT}"])
+    hosts = [f"http://{ELASTICSEARCH_HOST}:{ELASTICSEARCH_PORT}"]
+
+# Cliente síncrono para la indexación masiva y cliente asíncrono para los handlers de peticiones
+es = Elasticsearch(hosts, **client_options)
+async_es = AsyncElasticsearch(hosts, **client_options)
 
 if not es.ping():
     logger.error("❌ No se pudo conectar con Elasticsearch")
@@ -21,4 +37,4 @@ if not es.ping():
     # La aplicación puede funcionar parcialmente o el problema puede ser temporal
     # raise Exception("No se pudo conectar con Elasticsearch")
 
-es_manager = ElasticsearchManager(es)
+es_manager = ElasticsearchManager(es, async_es)
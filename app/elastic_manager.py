@@ -1,78 +1,185 @@
 import logging
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from typing import Dict, Any
-from elasticsearch import Elasticsearch
+from cachetools import TTLCache
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+from elasticsearch import Elasticsearch, AsyncElasticsearch
 from elasticsearch.helpers import bulk
 from elasticsearch.exceptions import NotFoundError
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
+# Número de particiones de cada bloque que se indexan en paralelo con helpers.bulk
+BULK_WORKERS = 4
+
+# Número máximo de índices por petición de get_mapping
+MAPPING_BATCH_SIZE = 50
+
+# Ajustes del índice durante la carga masiva; al terminar se restauran sus valores por defecto
+BULK_LOAD_SETTINGS = {
+    "refresh_interval": "-1",
+    "number_of_replicas": 0,
+    "translog.flush_threshold_size": "1gb"
+}
+
 class ElasticsearchManager:
-    def __init__(self, elasticsearch_client: Elasticsearch):
+    def __init__(self, elasticsearch_client: Elasticsearch, async_client: AsyncElasticsearch):
         self.es = elasticsearch_client
+        self.async_es = async_client
+        # Cachés con expiración: listado de índices por patrón (5s) y mappings por índice (60s)
+        self._indices_cache = TTLCache(maxsize=128, ttl=5)
+        self._mapping_cache = TTLCache(maxsize=256, ttl=60)
+        # Campos de texto de cada índice, usados en lugar de "*" en las búsquedas (60s, ya que otro
+        # worker puede recrear el índice con otro mapping)
+        self._field_cache = TTLCache(maxsize=256, ttl=60)
+        # Las cachés no son thread-safe y la indexación se ejecuta fuera del event loop
+        self._cache_lock = threading.Lock()
         logger.info("🔧 ElasticsearchManager inicializado")
 
     def create_index(self, index_name: str, mapping: Dict) -> bool:
         try:
-            if self.es.indices.exists(index=index_name):
-                self.es.indices.delete(index=index_name)
+            self.delete_index(index_name)
             self.es.indices.create(index=index_name, body={"mappings": mapping})
+            with self._cache_lock:
+                self._indices_cache.clear()
+                self._mapping_cache.pop(index_name, None)
+                self._field_cache[index_name] = self._text_fields(mapping)
             return True
         except Exception as e:
             logger.error(f"❌ Error creando índice {index_name}: {e}")
             return False
 
-    def index_dataframe(self, df: pd.DataFrame, index_name: str) -> Dict[str, Any]:
+    def delete_index(self, index_name: str) -> None:
+        # Borrar el índice sin comprobar antes si existe (un 404 se ignora)
+        self.es.options(ignore_status=404).indices.delete(index=index_name)
+        with self._cache_lock:
+            self._indices_cache.clear()
+            self._mapping_cache.pop(index_name, None)
+            self._field_cache.pop(index_name, None)
+
+    def _generate_actions(self, df: pd.DataFrame, index_name: str):
+        # Claves internadas: todos los documentos del bloque comparten los mismos objetos str
+        keys = tuple(sys.intern(str(column)) for column in df.columns)
+        # Extraer cada columna una sola vez como array (con None en lugar de NaN/NaT)
+        # y componer los documentos recorriendo las columnas en paralelo
+        null_mask = df.isna().to_numpy()
+        columns = []
+        for j, (_, column) in enumerate(df.items()):
+            values = column.to_numpy(dtype=object)
+            values[null_mask[:, j]] = None
+            columns.append(values)
+        for doc_id, row in zip(df.index, zip(*columns)):
+            yield {
+                "_index": index_name,
+                "_id": doc_id,
+                "_source": dict(zip(keys, row))
+            }
+
+    def _bulk_partition(self, df: pd.DataFrame, index_name: str) -> Tuple[int, list]:
+        return bulk(
+            self.es.options(request_timeout=120),
+            self._generate_actions(df, index_name),
+            chunk_size=2000,
+            max_chunk_bytes=20 * 1024 * 1024,
+            max_retries=3,
+            raise_on_error=False
+        )
+
+    def index_dataframe(self, data: Union[pd.DataFrame, Iterable[pd.DataFrame]], index_name: str) -> Dict[str, Any]:
         start_time = time.time()
-        
-        def generate_actions():
-            for index, row in df.iterrows():
-                doc = {k: (v if pd.notna(v) else None) for k, v in row.to_dict().items()}
-                yield {
-                    "_index": index_name,
-                    "_id": index,
-                    "_source": doc
-                }
+        # Acepta un DataFrame o un iterable de bloques (p. ej. un CSV leído por partes)
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        total_documents = 0
+        success_count = 0
+        errors = []
+
+        def collect(future):
+            nonlocal success_count
+            partition_success, partition_errors = future.result()
+            success_count += partition_success
+            errors.extend(partition_errors)
 
         try:
-            success_count, errors = bulk(self.es, generate_actions(), raise_on_error=False)
-            error_count = len(errors)
-            
+            # Cada bloque se reparte en BULK_WORKERS particiones por rango de filas que se
+            # indexan en paralelo; se limita el número de particiones pendientes para no
+            # retener en memoria más de un par de bloques a la vez
+            self.es.indices.put_settings(index=index_name, settings={"index": BULK_LOAD_SETTINGS})
+            try:
+                with ThreadPoolExecutor(max_workers=BULK_WORKERS) as executor:
+                    pending = deque()
+                    for df in chunks:
+                        total_documents += len(df)
+                        step = max(1, -(-len(df) // BULK_WORKERS))
+                        for start in range(0, len(df), step):
+                            pending.append(executor.submit(self._bulk_partition, df.iloc[start:start + step], index_name))
+                        while len(pending) > BULK_WORKERS:
+                            collect(pending.popleft())
+                    while pending:
+                        collect(pending.popleft())
+            finally:
+                self.es.indices.put_settings(
+                    index=index_name,
+                    settings={"index": {key: None for key in BULK_LOAD_SETTINGS}}
+                )
+
             self.es.indices.refresh(index=index_name)
+            # El listado cacheado durante la carga tendría el índice vacío o no lo incluiría
+            with self._cache_lock:
+                self._indices_cache.clear()
+                self._mapping_cache.pop(index_name, None)
             indexing_time = time.time() - start_time
             
             return {
-                "total_documents": len(df),
+                "total_documents": total_documents,
                 "success_count": success_count,
-                "error_count": error_count,
+                "error_count": len(errors),
                 "indexing_time_seconds": round(indexing_time, 2),
                 "documents_per_second": round(success_count / indexing_time, 2) if indexing_time > 0 else 0,
                 "errors": errors
             }
         except Exception as e:
             logger.error(f"❌ Error general en indexación masiva: {e}")
-            return {
-                "error": str(e),
-                "success_count": 0,
-                "error_count": len(df)
-            }
+            raise
+
+    @staticmethod
+    def _text_fields(mapping: Dict) -> List[str]:
+        return [
+            name for name, prop in mapping.get('properties', {}).items()
+            if prop.get('type') in ('text', 'keyword')
+        ]
+
+    async def _get_text_fields(self, index_name: str) -> List[str]:
+        with self._cache_lock:
+            fields = self._field_cache.get(index_name)
+        if fields is None:
+            response = await self.async_es.indices.get_mapping(index=index_name)
+            fields = self._text_fields(response[index_name]['mappings'])
+            with self._cache_lock:
+                self._field_cache[index_name] = fields
+        return fields
 
-    def search(self, index_name: str, query: str, size: int = 10, agg_fields: list[str] = None) -> Dict[str, Any]:
+    async def search(self, index_name: str, query: str, size: int = 10, agg_fields: list[str] = None, fuzziness: Optional[str] = "AUTO") -> Dict[str, Any]:
         start_time = time.time()
         try:
+            # Buscar solo en los campos de texto; si el índice no tiene ninguno, en todos
+            fields = await self._get_text_fields(index_name) or ["*"]
+            multi_match = {
+                "query": query,
+                "fields": fields,
+                "type": "best_fields"
+            }
+            if fuzziness:
+                multi_match["fuzziness"] = fuzziness
+
             search_body = {
-                "query": {
-                    "multi_match": {
-                        "query": query,
-                        "fields": ["*"],
-                        "type": "best_fields",
-                        "fuzziness": "AUTO"
-                    }
-                },
+                "query": {"multi_match": multi_match},
                 "size": size,
-                "highlight": {"fields": {"*": {}}},
+                "highlight": {"fields": {field: {} for field in fields}},
                 "aggs": {}
             }
 
@@ -82,7 +189,7 @@ class ElasticsearchManager:
                         "terms": {"field": f"{field}.keyword"}
                     }
 
-            response = self.es.search(index=index_name, body=search_body)
+            response = await self.async_es.search(index=index_name, body=search_body)
             hits = response['hits']
             results = [
                 {
@@ -108,8 +215,12 @@ class ElasticsearchManager:
 
     def get_indices(self, prefix: str = None) -> list[dict]:
         try:
-            # Usar un comodín si se especifica un prefijo
-            index_pattern = f"{prefix}*" if prefix else "*"
+            # Usar un comodín si se especifica un prefijo; los índices de sistema se excluyen en el servidor
+            index_pattern = f"{prefix}*" if prefix else "*,-.*"
+            with self._cache_lock:
+                cached = self._indices_cache.get(index_pattern)
+            if cached is not None:
+                return cached
             
             indices_info = self.es.cat.indices(
                 index=index_pattern, 
@@ -118,23 +229,35 @@ class ElasticsearchManager:
                 s="index:asc"
             )
             
+            # Pedir en una sola llamada los mappings que no estén en caché
+            with self._cache_lock:
+                mappings = {info['index']: self._mapping_cache.get(info['index']) for info in indices_info}
+            missing = [name for name, mapping in mappings.items() if mapping is None]
+            # Por lotes para no superar la longitud máxima de la URL
+            for i in range(0, len(missing), MAPPING_BATCH_SIZE):
+                batch = missing[i:i + MAPPING_BATCH_SIZE]
+                response = self.es.indices.get_mapping(index=",".join(batch))
+                with self._cache_lock:
+                    for name in batch:
+                        mappings[name] = self._mapping_cache[name] = response[name]['mappings']
+
             detailed_indices = []
             for index_info in indices_info:
                 index_name = index_info['index']
-                if not index_name.startswith('.'):
-                    mapping = self.es.indices.get_mapping(index=index_name)
-                    properties = mapping[index_name]['mappings'].get('properties', {})
-                    columns = [
-                        {"name": name, "type": prop.get("type", "unknown")}
-                        for name, prop in properties.items()
-                    ]
-                    detailed_indices.append({
-                        "name": index_name,
-                        "status": index_info['status'],
-                        "health": index_info['health'],
-                        "doc_count": index_info['docs.count'],
-                        "columns": columns
-                    })
+                properties = mappings[index_name].get('properties', {})
+                columns = [
+                    {"name": name, "type": prop.get("type", "unknown")}
+                    for name, prop in properties.items()
+                ]
+                detailed_indices.append({
+                    "name": index_name,
+                    "status": index_info['status'],
+                    "health": index_info['health'],
+                    "doc_count": index_info['docs.count'],
+                    "columns": columns
+                })
+            with self._cache_lock:
+                self._indices_cache[index_pattern] = detailed_indices
             return detailed_indices
         except Exception as e:
             logger.error(f"❌ Error obteniendo índices: {e}")
@@ -1,13 +1,17 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Query, Header
 from ..dependencies import es_manager, es
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 router = APIRouter()
 
 # Clave secreta para el cron job, obtenida de variables de entorno
 CRON_SECRET = os.getenv("CRON_SECRET")
 
+# Número máximo de índices por petición de borrado
+CLEANUP_BATCH_SIZE = 50
+
 @router.get("/indices")
 async def list_indices(session_id: str = Query(...)):
     """
@@ -16,11 +20,25 @@ async def list_indices(session_id: str = Query(...)):
     try:
         # El prefijo debe coincidir con el que se usa en upload_csv
         index_prefix = f"temp-{session_id}-"
-        indices = es_manager.get_indices(prefix=index_prefix)
+        indices = await asyncio.to_thread(es_manager.get_indices, prefix=index_prefix)
         return {"indices": indices}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo índices: {str(e)}")
 
+def _delete_expired_indices() -> list[str]:
+    # Una sola llamada para obtener la fecha de creación de todos los índices temporales
+    indices_info = es.cat.indices(index="temp-*", format="json", h="index,creation.date")
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=1)
+    expired_indices = [
+        info['index'] for info in indices_info
+        if datetime.fromtimestamp(int(info['creation.date']) / 1000, tz=timezone.utc) < cutoff
+    ]
+
+    # Borrar por lotes para no superar la longitud máxima de la URL
+    for i in range(0, len(expired_indices), CLEANUP_BATCH_SIZE):
+        es.indices.delete(index=",".join(expired_indices[i:i + CLEANUP_BATCH_SIZE]))
+    return expired_indices
+
 @router.post("/cleanup")
 async def cleanup_indices(authorization: str = Header(None)):
     """
@@ -31,16 +49,7 @@ async def cleanup_indices(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="No autorizado")
 
     try:
-        indices = es.indices.get(index="temp-*")
-        deleted_indices = []
-        for index_name in indices:
-            creation_date_str = es.indices.get_settings(index=index_name)[index_name]['settings']['index']['creation_date']
-            creation_date = datetime.fromtimestamp(int(creation_date_str) / 1000)
-            
-            if datetime.utcnow() - creation_date > timedelta(hours=1):
-                es.indices.delete(index=index_name)
-                deleted_indices.append(index_name)
-        
+        deleted_indices = await asyncio.to_thread(_delete_expired_indices)
         return {"message": "Limpieza completada", "deleted_indices": deleted_indices}
     except Exception as e:
         return {"message": f"Error durante la limpieza: {str(e)}"}
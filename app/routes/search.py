@@ -17,11 +17,12 @@ async def perform_search(request: SearchRequest):
         raise HTTPException(status_code=400, detail="La consulta no puede estar vacía")
 
     try:
-        search_results = es_manager.search(
+        search_results = await es_manager.search(
             index_name=request.index_name,
             query=request.query,
             size=request.size,
-            agg_fields=request.agg_fields
+            agg_fields=request.agg_fields,
+            fuzziness=request.fuzziness
         )
         return search_results
     except HTTPException as e:
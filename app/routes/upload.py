@@ -1,10 +1,50 @@
+import asyncio
+import re
+import pyarrow as pa
+from typing import Any, Dict, Tuple
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from ..dependencies import es_manager
-from ..utils import process_csv, infer_mapping
+from ..utils import open_csv, process_csv, infer_mapping, csv_error_column
 from ..schemas import UploadResponse
 
 router = APIRouter()
 
+# Caracteres permitidos en el nombre del índice y en el id de sesión que forman el índice temporal
+_VALID_INDEX = re.compile(r"[A-Za-z0-9_-]+")
+
+def _index_csv(file, index_name: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Lee el CSV en streaming, crea el índice temporal e indexa sus bloques.
+    Es bloqueante, por lo que se ejecuta fuera del event loop.
+    """
+    column_types = {}
+    try:
+        while True:
+            # Inferir el mapping a partir del esquema Arrow del primer bloque
+            reader = open_csv(file, column_types)
+            mapping = infer_mapping(reader.schema)
+
+            # Crear índice temporal (si ya existe de un intento anterior, se recrea)
+            es_manager.create_index(index_name, mapping)
+
+            # Indexar los bloques del CSV a medida que se leen
+            try:
+                stats = es_manager.index_dataframe(process_csv(reader), index_name)
+            except pa.ArrowInvalid as e:
+                # Un bloque posterior no encaja con el tipo inferido: releer el CSV ampliando el tipo de esa
+                # columna, de entero a float y, si vuelve a fallar, a texto
+                column = csv_error_column(e, reader.schema)
+                column_type = reader.schema.field(column).type if column is not None else None
+                if column_type is None or pa.types.is_string(column_type):
+                    raise
+                column_types[column] = pa.float64() if pa.types.is_integer(column_type) else pa.string()
+                continue
+            return mapping, stats
+    except Exception:
+        # No dejar un índice parcial
+        es_manager.delete_index(index_name)
+        raise
+
 @router.post("/upload-csv", response_model=UploadResponse)
 async def upload_csv(
     file: UploadFile = File(...), 
@@ -18,18 +58,16 @@ async def upload_csv(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="El archivo debe ser un CSV")
 
+    if not _VALID_INDEX.fullmatch(index_name) or not _VALID_INDEX.fullmatch(session_id):
+        raise HTTPException(status_code=400, detail="El nombre del índice solo puede contener letras, números, '_' y '-'")
+
     try:
         # Construir un nombre de índice temporal y seguro
         temp_index_name = f"temp-{session_id}-{index_name}".lower()
 
-        df = process_csv(file.file)
-        mapping = infer_mapping(df)
-        
-        # Crear índice temporal
-        es_manager.create_index(temp_index_name, mapping)
-        
-        # Indexar datos en el índice temporal
-        stats = es_manager.index_dataframe(df, temp_index_name)
+        # Procesar el CSV en un hilo para no bloquear el event loop
+        loop = asyncio.get_running_loop()
+        mapping, stats = await loop.run_in_executor(None, _index_csv, file.file, temp_index_name)
         
         return UploadResponse(
             filename=file.filename,
@@ -22,6 +22,7 @@ class SearchRequest(BaseModel):
     session_id: str  # Añadido para la validación
     size: int = 10
     agg_fields: Optional[List[str]] = Field(None, description="Fields to aggregate on")
+    fuzziness: Optional[str] = Field("AUTO", description="Fuzziness for the match query, null to disable it")
 
 class SearchResult(BaseModel):
     query: str
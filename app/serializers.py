@@ -0,0 +1,26 @@
+import orjson
+from typing import Any
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
+
+class ORJSONSerializer(JSONSerializer):
+    """
+    Serializador JSON del cliente de Elasticsearch basado en orjson.
+    Los tipos que orjson no soporta (Timestamp de Pandas, Decimal, ...) se delegan en `default`.
+    """
+    def dumps(self, data: Any) -> bytes:
+        # El cuerpo ya viene codificado
+        if isinstance(data, str):
+            return data.encode("utf-8", "surrogatepass")
+        if isinstance(data, bytes):
+            return data
+        return orjson.dumps(data, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(self, data: bytes) -> Any:
+        # Algunas respuestas con Content-Type JSON no tienen cuerpo
+        if data == b"":
+            return None
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise SerializationError(message=f"Unable to deserialize as JSON: {data!r}", errors=(e,))
@@ -1,32 +1,137 @@
+import csv
+import io
+import mmap
+import os
+import re
 import pandas as pd
-from io import StringIO
-
-def process_csv(file) -> pd.DataFrame:
-    """
-    Lee un archivo CSV en un DataFrame de Pandas.
-    """
-    content = file.read().decode('utf-8')
-    return pd.read_csv(StringIO(content))
-
-def infer_mapping(df: pd.DataFrame) -> dict:
-    """
-    Infiere un mapping de Elasticsearch a partir de los tipos de un DataFrame.
-    """
-    properties = {}
-    for column, dtype in df.dtypes.items():
-        if pd.api.types.is_numeric_dtype(dtype):
-            properties[column] = {"type": "float"} # Usar float para números
-        elif pd.api.types.is_datetime64_any_dtype(dtype):
-            properties[column] = {"type": "date"}
-        else:
-            # Por defecto, tratar como texto con un sub-campo .keyword para agregaciones
-            properties[column] = {
-                "type": "text",
-                "fields": {
-                    "keyword": {
-                        "type": "keyword",
-                        "ignore_above": 256
-                    }
-                }
-            }
-    return {"properties": properties}
+import pyarrow as pa
+from pyarrow import csv as pacsv
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+# Tamaño de bloque del lector CSV de Arrow; los tipos se infieren a partir del primer bloque
+CSV_BLOCK_SIZE = 8 << 20
+
+# Columna que provoca un error de conversión en el lector CSV de Arrow
+_CSV_ERROR_COLUMN = re.compile(r"In CSV column #(\d+)")
+
+def _csv_buffer(file) -> pa.Buffer:
+    """
+    Devuelve el contenido del archivo subido como buffer Arrow (mapeado en memoria si está en disco).
+    Los lectores Arrow leen por adelantado desde sus hilos: leyendo de un buffer nativo no compiten
+    por la posición del objeto archivo de Python ni por el GIL cuando se descarta un lector.
+    """
+    if hasattr(file, "rollover"):
+        # SpooledTemporaryFile: pasarlo a disco para poder mapearlo
+        file.rollover()
+    try:
+        fileno = file.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        return pa.py_buffer(file.getvalue())
+    file.flush()
+    if os.fstat(fileno).st_size == 0:
+        return pa.py_buffer(b"")
+    return pa.py_buffer(mmap.mmap(fileno, 0, access=mmap.ACCESS_READ))
+
+def _column_names(buffer: pa.Buffer) -> List[str]:
+    """
+    Lee la cabecera del CSV y renombra las columnas como lo hacía pandas.read_csv:
+    las vacías pasan a "Unnamed: {i}" y las repetidas a "nombre.1", "nombre.2"...
+    """
+    text = io.TextIOWrapper(pa.BufferReader(buffer), encoding="utf-8-sig", newline="")
+    header = next(csv.reader(text), [])
+
+    names = [name if name else f"Unnamed: {i}" for i, name in enumerate(header)]
+    counts = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def _read_csv(buffer: pa.Buffer, column_names: List[str], column_types: Dict[str, pa.DataType]) -> pacsv.CSVStreamingReader:
+    if column_names:
+        # Saltar la cabecera original y usar los nombres ya normalizados
+        read_options = pacsv.ReadOptions(
+            block_size=CSV_BLOCK_SIZE, use_threads=True, column_names=column_names, skip_rows=1
+        )
+    else:
+        read_options = pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE, use_threads=True)
+    return pacsv.open_csv(
+        pa.BufferReader(buffer),
+        read_options=read_options,
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+
+def open_csv(file, column_types: Optional[Dict[str, pa.DataType]] = None) -> pacsv.CSVStreamingReader:
+    """
+    Abre un archivo CSV con el lector en streaming de Arrow (multihilo, por bloques)
+    desde el principio, forzando los tipos indicados en column_types.
+    """
+    buffer = _csv_buffer(file)
+    column_names = _column_names(buffer)
+    column_types = dict(column_types or {})
+    reader = _read_csv(buffer, column_names, column_types)
+
+    # Las columnas vacías en el primer bloque se infieren como null y fallarían con el primer valor:
+    # leerlas como texto
+    null_columns = {field.name: pa.string() for field in reader.schema if pa.types.is_null(field.type)}
+    if null_columns:
+        reader = _read_csv(buffer, column_names, {**column_types, **null_columns})
+    return reader
+
+def csv_error_column(error: pa.ArrowInvalid, schema: pa.Schema) -> Optional[str]:
+    """
+    Devuelve el nombre de la columna que provocó un error de conversión del CSV, si se puede identificar.
+    """
+    match = _CSV_ERROR_COLUMN.search(str(error))
+    if match is None or int(match.group(1)) >= len(schema):
+        return None
+    return schema.field(int(match.group(1))).name
+
+def process_csv(reader: pacsv.CSVStreamingReader) -> Iterator[pd.DataFrame]:
+    """
+    Convierte cada lote del lector CSV en un DataFrame de Pandas con índice global.
+    """
+    offset = 0
+    for batch in reader:
+        # Convertir sin consolidar bloques y liberando la memoria Arrow de cada columna convertida
+        df = batch.to_pandas(split_blocks=True, self_destruct=True)
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        offset += len(df)
+        yield df
+
+# Propiedades de Elasticsearch según el tipo Arrow de la columna
+_NUMERIC_PROPERTY = {"type": "float"} # Usar float para números
+_BOOLEAN_PROPERTY = {"type": "boolean"}
+_DATE_PROPERTY = {"type": "date"}
+# Por defecto, tratar como texto con un sub-campo .keyword para agregaciones
+_TEXT_PROPERTY = {
+    "type": "text",
+    "fields": {
+        "keyword": {
+            "type": "keyword",
+            "ignore_above": 256
+        }
+    }
+}
+
+@lru_cache(maxsize=64)
+def _es_property(arrow_type: pa.DataType) -> dict:
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+        return _NUMERIC_PROPERTY
+    if pa.types.is_boolean(arrow_type):
+        return _BOOLEAN_PROPERTY
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return _DATE_PROPERTY
+    return _TEXT_PROPERTY
+
+def infer_mapping(schema: pa.Schema) -> dict:
+    """
+    Infiere un mapping de Elasticsearch a partir del esquema Arrow del CSV.
+    """
+    return {"properties": {field.name: _es_property(field.type) for field in schema}}
@@ -0,0 +1,18 @@
+import io
+
+from app.utils import open_csv, process_csv
+
+def _read(data: bytes):
+    reader = open_csv(io.BytesIO(data))
+    return reader.schema.names, [row for df in process_csv(reader) for row in df.to_dict("records")]
+
+def test_empty_header_is_named_like_pandas():
+    # Cabecera de df.to_csv() con el índice sin nombre
+    names, rows = _read(b",x\n0,a\n1,b\n")
+    assert names == ["Unnamed: 0", "x"]
+    assert rows == [{"Unnamed: 0": 0, "x": "a"}, {"Unnamed: 0": 1, "x": "b"}]
+
+def test_duplicate_headers_are_renamed_like_pandas():
+    names, rows = _read(b"a,a,b,a\n1,2,3,4\n")
+    assert names == ["a", "a.1", "b", "a.2"]
+    assert rows == [{"a": 1, "a.1": 2, "b": 3, "a.2": 4}]